@@ -6,11 +6,38 @@ This script analyzes the binary data coming from the KVH device to understand
 its actual format and find any patterns that might indicate message boundaries.
 """
 
-import subprocess
-import time
-import struct
 from collections import Counter
 
+import numpy as np
+
+from kvh_serial import capture_stream
+
+try:
+    import ahocorasick
+except ImportError:  # pyahocorasick is optional, fall back to one scan per pattern
+    ahocorasick = None
+
+def find_pattern_positions(data, patterns):
+    """Find all (overlapping) positions of each (pattern, name) pair in data"""
+    positions = {name: [] for _, name in patterns}
+    
+    if ahocorasick is not None:
+        # Single pass over the buffer; latin-1 maps every byte to one character
+        automaton = ahocorasick.Automaton()
+        for pattern, name in patterns:
+            automaton.add_word(pattern.decode('latin-1'), (len(pattern), name))
+        automaton.make_automaton()
+        for end, (length, name) in automaton.iter(data.decode('latin-1')):
+            positions[name].append(end - length + 1)
+        return positions
+    
+    for pattern, name in patterns:
+        pos = data.find(pattern)
+        while pos != -1:
+            positions[name].append(pos)
+            pos = data.find(pattern, pos + 1)
+    return positions
+
 def analyze_data_patterns(data):
     """Analyze binary data for patterns"""
     
@@ -36,47 +63,43 @@ def analyze_data_patterns(data):
         (b'\x56\xFF\x81\xFE', "Reversed Format B"),
     ]
     
+    pattern_positions = find_pattern_positions(data, kvh_patterns)
     for pattern, name in kvh_patterns:
-        count = data.count(pattern)
-        if count > 0:
-            print(f"  {name}: {count} occurrences")
+        positions = pattern_positions[name]
+        if positions:
+            print(f"  {name}: {len(positions)} occurrences")
             # Show positions
-            pos = 0
-            positions = []
-            while pos < len(data):
-                pos = data.find(pattern, pos)
-                if pos == -1:
-                    break
-                positions.append(pos)
-                pos += 1
             print(f"    Positions: {positions[:5]}..." if len(positions) > 5 else f"    Positions: {positions}")
     
     # Look for repeating 4-byte patterns that might be headers
     print(f"\nLooking for repeating 4-byte patterns...")
-    four_byte_patterns = Counter()
-    for i in range(len(data) - 3):
-        pattern = data[i:i+4]
-        four_byte_patterns[pattern] += 1
-    
-    # Show patterns that appear multiple times
-    common_patterns = [(pattern, count) for pattern, count in four_byte_patterns.items() if count > 2]
-    common_patterns.sort(key=lambda x: x[1], reverse=True)
-    
-    for pattern, count in common_patterns[:10]:
-        print(f"  {pattern.hex()}: {count} times")
+    raw = np.frombuffer(data, dtype=np.uint8).astype(np.uint32)
+    # Big-endian value of the 4-byte window starting at every offset
+    windows = (raw[:-3] << 24) | (raw[1:-2] << 16) | (raw[2:-1] << 8) | raw[3:]
+    # Group every offset by its window value with one stable sort. Offsets stay
+    # ascending within a group, so positions need no rescan of the data later.
+    offsets = np.argsort(windows, kind='stable')
+    grouped = windows[offsets]
+    is_start = np.ones(grouped.size, dtype=bool)
+    is_start[1:] = grouped[1:] != grouped[:-1]
+    starts = np.flatnonzero(is_start)
+    counts = np.diff(np.append(starts, grouped.size))
+    
+    # Show patterns that appear multiple times, most frequent (then earliest) first
+    common = counts > 2
+    starts, counts = starts[common], counts[common]
+    order = np.lexsort((offsets[starts], -counts))
+    
+    for start, count in zip(starts[order[:10]].tolist(), counts[order[:10]].tolist()):
+        print(f"  {int(grouped[start]).to_bytes(4, 'big').hex()}: {count} times")
         # Check if this could be a message header by looking at spacing
-        positions = []
-        pos = 0
-        while pos < len(data) - 3:
-            if data[pos:pos+4] == pattern:
-                positions.append(pos)
-            pos += 1
+        positions = offsets[start:start + count]
         
         if len(positions) >= 2:
             # Calculate intervals between occurrences
-            intervals = [positions[i+1] - positions[i] for i in range(len(positions)-1)]
-            if len(set(intervals)) <= 3:  # If intervals are fairly consistent
-                print(f"    Regular intervals: {list(set(intervals))}")
+            intervals = np.unique(np.diff(positions))
+            if len(intervals) <= 3:  # If intervals are fairly consistent
+                print(f"    Regular intervals: {intervals.tolist()}")
 
 def try_ascii_decode(data):
     """Try to decode parts of the data as ASCII"""
@@ -98,31 +121,27 @@ def analyze_as_measurements(data):
     
     # Try different interpretations of the binary data
     interpretations = [
-        ('>f', 4, "Big-endian float"),
-        ('<f', 4, "Little-endian float"), 
-        ('>h', 2, "Big-endian 16-bit int"),
-        ('<h', 2, "Little-endian 16-bit int"),
-        ('>i', 4, "Big-endian 32-bit int"),
-        ('<i', 4, "Little-endian 32-bit int"),
+        ('>f4', "Big-endian float"),
+        ('<f4', "Little-endian float"), 
+        ('>i2', "Big-endian 16-bit int"),
+        ('<i2', "Little-endian 16-bit int"),
+        ('>i4', "Big-endian 32-bit int"),
+        ('<i4', "Little-endian 32-bit int"),
     ]
     
-    for fmt, size, desc in interpretations:
+    for dtype, desc in interpretations:
+        dtype = np.dtype(dtype)
+        size = dtype.itemsize
         if len(data) >= size * 5:  # Need at least 5 values
-            try:
-                values = []
-                for i in range(0, min(len(data) - size + 1, size * 20), size):
-                    value = struct.unpack(fmt, data[i:i+size])[0]
-                    values.append(value)
-                
-                # Check if values look reasonable for IMU data
-                if fmt.endswith('f'):  # Float values
-                    reasonable = [v for v in values if -100 < v < 100 and abs(v) > 0.001]
-                    if len(reasonable) > len(values) * 0.3:  # At least 30% reasonable
-                        print(f"{desc}: {len(reasonable)}/{len(values)} reasonable values")
-                        print(f"  Sample values: {reasonable[:5]}")
-                
-            except struct.error:
-                pass
+            values = np.frombuffer(data, dtype=dtype, count=min(len(data) // size, 20))
+            
+            # Check if values look reasonable for IMU data
+            if dtype.kind == 'f':  # Float values
+                magnitude = np.abs(values)
+                reasonable = values[(magnitude < 100) & (magnitude > 0.001)]
+                if reasonable.size > values.size * 0.3:  # At least 30% reasonable
+                    print(f"{desc}: {reasonable.size}/{values.size} reasonable values")
+                    print(f"  Sample values: {reasonable[:5].tolist()}")
 
 def main():
     """Main analysis function"""
@@ -132,11 +151,8 @@ def main():
     # Collect data from device
     print("Collecting data from device...")
     device_path = "/dev/cu.usbserial-FT0R4P590"
-    proc = subprocess.Popen(['socat', f'{device_path},raw,echo=0,ispeed=115200,ospeed=115200', '-'], 
-                           stdout=subprocess.PIPE)
-    time.sleep(5)  # Collect for 5 seconds
-    proc.terminate()
-    stdout, _ = proc.communicate()
+    stdout = capture_stream(['socat', f'{device_path},raw,echo=0,ispeed=115200,ospeed=115200', '-'],
+                            duration=5)  # Collect for 5 seconds
     
     if len(stdout) == 0:
         print("No data received from device!")
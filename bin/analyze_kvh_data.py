@@ -4,8 +4,14 @@ Quick utility to analyze the raw binary data from KVH device
 to look for headers and patterns.
 """
 
+import struct
 import sys
 
+import numpy as np
+
+_U32_BIG = struct.Struct('>I')
+_U32_LITTLE = struct.Struct('<I')
+
 # Sample data from the connector output (hex format)
 sample_data_hex = "fcfffefdf8fffffffcfffefefdfffffcfcfffffcfffefffffffffbfffffffffcfffffffffffffffffefffffcf9fffdfffdff"
 
@@ -29,32 +35,35 @@ def analyze_binary_data(hex_string):
     
     print("\nSearching for KVH headers...")
     
-    for i in range(len(data) - 3):
-        # Check 4-byte sequences
-        four_bytes = data[i:i+4]
-        if len(four_bytes) == 4:
-            value = int.from_bytes(four_bytes, byteorder='big')
-            value_little = int.from_bytes(four_bytes, byteorder='little')
-            
-            for header, name in headers_to_check:
-                if value == header:
-                    print(f"Found {name} header at offset {i}: {value:08X} (big-endian)")
-                if value_little == header:
-                    print(f"Found {name} header at offset {i}: {value_little:08X} (little-endian)")
+    # Only offsets where some header matches in either byte order need a closer look
+    raw = np.frombuffer(data, dtype=np.uint8).astype(np.uint32)
+    words_big = (raw[:-3] << 24) | (raw[1:-2] << 16) | (raw[2:-1] << 8) | raw[3:]
+    words_little = (raw[3:] << 24) | (raw[2:-1] << 16) | (raw[1:-2] << 8) | raw[:-3]
+    header_values = [header for header, _ in headers_to_check]
+    matches = np.isin(words_big, header_values) | np.isin(words_little, header_values)
+    
+    header_names = dict(headers_to_check)
+    view = memoryview(data)
+    for i in np.flatnonzero(matches).tolist():
+        # Check 4-byte sequences without slicing out a copy
+        value, = _U32_BIG.unpack_from(view, i)
+        value_little, = _U32_LITTLE.unpack_from(view, i)
+        
+        if value in header_names:
+            print(f"Found {header_names[value]} header at offset {i}: {value:08X} (big-endian)")
+        if value_little in header_names:
+            print(f"Found {header_names[value_little]} header at offset {i}: {value_little:08X} (little-endian)")
     
     print("\nLooking for repeating patterns...")
     # Look for patterns that might indicate packet boundaries
-    pattern_counts = {}
-    for i in range(len(data) - 1):
-        two_bytes = data[i:i+2]
-        pattern = two_bytes.hex()
-        pattern_counts[pattern] = pattern_counts.get(pattern, 0) + 1
+    pairs = (raw[:-1] << 8) | raw[1:]  # 2-byte window starting at every offset
+    values, first_seen, counts = np.unique(pairs, return_index=True, return_counts=True)
     
-    # Show most common 2-byte patterns
-    common_patterns = sorted(pattern_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+    # Show most common 2-byte patterns (ties in order of first occurrence)
+    common_patterns = np.lexsort((first_seen, -counts))[:10]
     print("Most common 2-byte patterns:")
-    for pattern, count in common_patterns:
-        print(f"  {pattern}: {count} occurrences")
+    for value, count in zip(values[common_patterns].tolist(), counts[common_patterns].tolist()):
+        print(f"  {value:04x}: {count} occurrences")
 
 if __name__ == "__main__":
     # Test with sample data
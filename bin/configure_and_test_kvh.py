@@ -9,11 +9,17 @@ Usage:
   ./configure_and_test_kvh.py
 """
 
+import re
 import sys
 import time
 import subprocess
 import threading
 
+from kvh_serial import capture_stream
+
+# KVH binary headers 0xFE81FF55-0xFE81FF57 (formats A, B and C)
+KVH_HEADER_RE = re.compile(rb'\xfe\x81\xff[\x55-\x57]')
+
 def send_configuration_commands():
     """Send configuration commands to KVH device via socat"""
     
@@ -28,21 +34,28 @@ def send_configuration_commands():
     
     print("Sending configuration commands to KVH P1775...")
     
-    # Use socat to send commands - use echo to pipe commands
+    # Use a single socat session for all commands, as configure_kvh_device.py does
     device_path = "/dev/cu.usbserial-FT0R4P590"
+    socat_cmd = ['socat', '-', f'{device_path},raw,echo=0,ispeed=115200,ospeed=115200']
     
+    proc = None
     try:
+        proc = subprocess.Popen(socat_cmd, stdin=subprocess.PIPE,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        
         for i, cmd in enumerate(config_commands):
             print(f"Sending command {i+1}/{len(config_commands)}: {cmd}")
             
-            # Send each command individually using echo and socat
-            full_cmd = f'echo "{cmd}" | socat - {device_path},raw,echo=0,ispeed=115200,ospeed=115200'
-            result = subprocess.run(full_cmd, shell=True, capture_output=True, text=True, timeout=5)
+            proc.stdin.write((cmd + '\r\n').encode())
+            proc.stdin.flush()
             
-            if result.returncode != 0:
-                print(f"Warning: Command may have failed: {result.stderr}")
-            
-            time.sleep(0.5)  # Wait between commands
+            # Delay between commands (important for device to process)
+            if i < len(config_commands) - 1:
+                time.sleep(0.2)
+        
+        _, stderr = proc.communicate(timeout=5)
+        if proc.returncode != 0:
+            print(f"Warning: Commands may have failed: {stderr.decode(errors='replace')}")
         
         print("Configuration commands sent successfully.")
         return True
@@ -50,23 +63,23 @@ def send_configuration_commands():
     except Exception as e:
         print(f"Error sending configuration: {e}")
         return False
+    
+    finally:
+        # Don't leave socat holding the tty that test_device_output opens next
+        if proc is not None and proc.poll() is None:
+            proc.kill()
+            proc.communicate()
 
 def test_device_output():
     """Test the device output to see if it's in binary format"""
     
     print("\nTesting device output format...")
     device_path = "/dev/cu.usbserial-FT0R4P590"
-    socat_cmd = f"socat {device_path},raw,echo=0,ispeed=115200,ospeed=115200 -"
+    socat_cmd = ['socat', f'{device_path},raw,echo=0,ispeed=115200,ospeed=115200', '-']
     
     try:
-        proc = subprocess.Popen(socat_cmd, shell=True, stdout=subprocess.PIPE, 
-                               stderr=subprocess.PIPE)
-        
         # Read data for 3 seconds
-        time.sleep(3)
-        proc.terminate()
-        
-        stdout, stderr = proc.communicate()
+        stdout = capture_stream(socat_cmd, duration=3)
         
         if stdout:
             print(f"Received {len(stdout)} bytes")
@@ -79,24 +92,22 @@ def test_device_output():
                 (b'\xFE\x81\xFF\x57', "Format C"),
             ]
             
+            # Locate the headers of all formats in a single pass over the data
+            header_positions = {}
+            for match in KVH_HEADER_RE.finditer(stdout):
+                header_positions.setdefault(match.group(), []).append(match.start())
+            
             found_header = False
             for header_bytes, header_name in headers:
-                if header_bytes in stdout:
+                positions = header_positions.get(header_bytes)
+                if positions:
                     print(f"✓ Found {header_name} header in data!")
                     found_header = True
                     
-                    # Find positions of headers
-                    pos = 0
-                    count = 0
-                    while pos < len(stdout) - len(header_bytes):
-                        pos = stdout.find(header_bytes, pos)
-                        if pos == -1:
-                            break
-                        count += 1
-                        if count <= 3:  # Show first 3 positions
-                            print(f"  Header at position {pos}")
-                        pos += 1
-                    print(f"  Total {header_name} headers found: {count}")
+                    # Show first 3 positions
+                    for pos in positions[:3]:
+                        print(f"  Header at position {pos}")
+                    print(f"  Total {header_name} headers found: {len(positions)}")
             
             if not found_header:
                 print("✗ No KVH binary headers found in data")
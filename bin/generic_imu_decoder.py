@@ -6,74 +6,74 @@ This script tries to decode the actual binary data coming from the connected dev
 using the patterns we detected rather than assuming it's a KVH P1775.
 """
 
-import subprocess
-import time
+import functools
+import re
 import struct
 from datetime import datetime
 
+from kvh_serial import capture_stream
+
+# Sync pattern detected in the captured data
+SYNC_PATTERN = b'\x07\xea\x81\x00'
+
+@functools.lru_cache(maxsize=None)
+def _sync_regex(sync_pattern):
+    """Compile a lookahead regex so overlapping occurrences are found too"""
+    return re.compile(b'(?=' + re.escape(sync_pattern) + b')')
+
 def find_message_boundaries(data, sync_pattern):
     """Find positions where sync pattern occurs"""
-    positions = []
-    search_pos = 0
-    
-    while search_pos < len(data) - len(sync_pattern):
-        pos = data.find(sync_pattern, search_pos)
-        if pos == -1:
-            break
-        positions.append(pos)
-        search_pos = pos + 1
-    
-    return positions
+    return [match.start() for match in _sync_regex(sync_pattern).finditer(data)]
+
+# Candidate message layouts, compiled once: (struct, field_names, value_limit)
+# Every payload value of a layout has the same type, so the "reasonable" range
+# check is specialized per layout instead of dispatching on each value's type.
+_FLOAT_LIMIT = 100  # Reasonable range for IMU
+_INT16_LIMIT = 32000  # Reasonable range for 16-bit IMU
+_IMU_FLOAT_FIELDS = ['header', 'accel_x', 'accel_y', 'accel_z', 'gyro_x', 'gyro_y', 'gyro_z']
+_IMU_INT_FIELDS = ['header', 'accel_x', 'accel_y', 'accel_z', 'gyro_x', 'gyro_y', 'gyro_z', 'temp']
+_INTERPRETATIONS = [
+    (struct.Struct('>Iffffff'), _IMU_FLOAT_FIELDS, _FLOAT_LIMIT),
+    (struct.Struct('<Iffffff'), _IMU_FLOAT_FIELDS, _FLOAT_LIMIT),
+    (struct.Struct('>Ihhhhhhh'), _IMU_INT_FIELDS, _INT16_LIMIT),
+    (struct.Struct('<Ihhhhhhh'), _IMU_INT_FIELDS, _INT16_LIMIT),
+]
+
+# Message lengths worth trying; only layouts of one of these sizes are candidates.
+# Note that none of the layouts above (28 and 18 bytes) currently has one of them.
+_MESSAGE_LENGTHS = [16, 20, 24, 32, 40, 48, 64]
+# Candidate layouts in the order they are tried (shortest message first)
+_CANDIDATES = sorted(
+    (candidate for candidate in _INTERPRETATIONS if candidate[0].size in _MESSAGE_LENGTHS),
+    key=lambda candidate: candidate[0].size,
+)
 
 def decode_generic_imu_message(data, start_pos):
     """Try to decode a generic IMU message starting at given position"""
     
-    # Try different message lengths
-    for msg_len in [16, 20, 24, 32, 40, 48, 64]:
+    # Zero-copy view, so 'raw' does not allocate a new bytes object
+    data = memoryview(data)
+    
+    for fmt_struct, fields, limit in _CANDIDATES:
+        msg_len = fmt_struct.size
         if start_pos + msg_len > len(data):
             continue
-            
-        message = data[start_pos:start_pos + msg_len]
         
-        try:
-            # Try different interpretations
-            interpretations = [
-                # Format: (struct_format, field_names)
-                ('>Iffffff', ['header', 'accel_x', 'accel_y', 'accel_z', 'gyro_x', 'gyro_y', 'gyro_z']),
-                ('<Iffffff', ['header', 'accel_x', 'accel_y', 'accel_z', 'gyro_x', 'gyro_y', 'gyro_z']),
-                ('>Ihhhhhhh', ['header', 'accel_x', 'accel_y', 'accel_z', 'gyro_x', 'gyro_y', 'gyro_z', 'temp']),
-                ('<Ihhhhhhh', ['header', 'accel_x', 'accel_y', 'accel_z', 'gyro_x', 'gyro_y', 'gyro_z', 'temp']),
-            ]
+        values = fmt_struct.unpack_from(data, start_pos)
+        
+        # Check if the values look reasonable for IMU data
+        if len(values) >= 4:  # At least header + 3 values
+            reasonable_count = sum(-limit < val < limit for val in values[1:])  # Skip header
             
-            for fmt, fields in interpretations:
-                if struct.calcsize(fmt) == msg_len:
-                    try:
-                        values = struct.unpack(fmt, message)
-                        
-                        # Check if the values look reasonable for IMU data
-                        if len(values) >= 4:  # At least header + 3 values
-                            reasonable_count = 0
-                            for i, val in enumerate(values[1:]):  # Skip header
-                                if isinstance(val, float):
-                                    if -100 < val < 100:  # Reasonable range for IMU
-                                        reasonable_count += 1
-                                elif isinstance(val, int):
-                                    if -32000 < val < 32000:  # Reasonable range for 16-bit IMU
-                                        reasonable_count += 1
-                            
-                            if reasonable_count >= len(values) // 2:  # At least half reasonable
-                                return {
-                                    'format': fmt,
-                                    'fields': fields,
-                                    'values': values,
-                                    'raw': message,
-                                    'length': msg_len,
-                                    'reasonable_values': reasonable_count
-                                }
-                    except struct.error:
-                        continue
-        except:
-            continue
+            if reasonable_count >= len(values) // 2:  # At least half reasonable
+                return {
+                    'format': fmt_struct.format,
+                    'fields': fields,
+                    'values': values,
+                    'raw': data[start_pos:start_pos + msg_len],
+                    'length': msg_len,
+                    'reasonable_values': reasonable_count
+                }
     
     return None
 
@@ -87,16 +87,13 @@ def main():
     device_path = "/dev/cu.usbserial-FT0R4P590"
     
     print(f"Collecting data at {baud_rate} baud...")
-    proc = subprocess.Popen(['socat', f'{device_path},raw,echo=0,ispeed={baud_rate},ospeed={baud_rate}', '-'], 
-                           stdout=subprocess.PIPE)
-    time.sleep(5)  # Collect for 5 seconds
-    proc.terminate()
-    data, _ = proc.communicate()
+    data = capture_stream(['socat', f'{device_path},raw,echo=0,ispeed={baud_rate},ospeed={baud_rate}', '-'],
+                          duration=5)  # Collect for 5 seconds
     
     print(f"Collected {len(data)} bytes")
     
     # Look for the sync pattern we found
-    sync_pattern = b'\x07\xea\x81\x00'
+    sync_pattern = SYNC_PATTERN
     positions = find_message_boundaries(data, sync_pattern)
     
     print(f"Found {len(positions)} occurrences of sync pattern {sync_pattern.hex()}")
@@ -133,14 +130,11 @@ def main():
         
         # Try to decode a few more messages with this format
         print(f"\nDecoding more messages with best format...")
+        best_struct = struct.Struct(best_result[2]['format'])
         for i, pos in enumerate(positions[5:10]):  # Next 5 messages
-            if pos + best_result[2]['length'] <= len(data):
-                msg_data = data[pos:pos + best_result[2]['length']]
-                try:
-                    values = struct.unpack(best_result[2]['format'], msg_data)
-                    print(f"Message {i+6}: {dict(zip(best_result[2]['fields'], values))}")
-                except:
-                    print(f"Message {i+6}: decode failed")
+            if pos + best_struct.size <= len(data):
+                values = best_struct.unpack_from(data, pos)
+                print(f"Message {i+6}: {dict(zip(best_result[2]['fields'], values))}")
     else:
         print("No successful message decodes found")
         print("This device may not be an IMU or may use a different protocol entirely")
@@ -8,16 +8,28 @@ import sys
 import time
 from collections import Counter
 
+import numpy as np
+
+def most_common_bytes(histogram, n):
+    """Return the n most common (byte, count) pairs of a 256-bin histogram"""
+    return Counter({byte: count for byte, count in enumerate(histogram.tolist()) if count}).most_common(n)
+
+def count_printable_and_null(sample):
+    """Count printable ASCII (32-126) and null bytes in a bytes-like sample"""
+    sample = np.frombuffer(sample, dtype=np.uint8)
+    printable = (sample >= 32) & (sample <= 126)
+    return int(np.count_nonzero(printable)), int(np.count_nonzero(sample == 0))
+
 def inspect_data():
     """Inspect incoming data to help identify the format"""
     
     print("Data Inspector - Reading from stdin...")
     print("Press Ctrl+C to quit\n")
     
-    buffer = b''
+    buffer = bytearray()
     byte_count = 0
     chunk_count = 0
-    byte_histogram = Counter()
+    byte_histogram = np.zeros(256, dtype=np.int64)
     
     # Look for common patterns
     patterns_to_check = [
@@ -38,20 +50,20 @@ def inspect_data():
             if not chunk:
                 break
             
-            buffer += chunk
+            buffer.extend(chunk)  # amortized O(1), unlike bytes concatenation
             byte_count += len(chunk)
             chunk_count += 1
             
             # Update byte histogram
-            for byte in chunk:
-                byte_histogram[byte] += 1
+            byte_histogram += np.bincount(np.frombuffer(chunk, dtype=np.uint8), minlength=256)
             
-            # Check for patterns
+            # Check for patterns in the new chunk, plus enough of the previous
+            # data to catch occurrences straddling the chunk boundary
             for pattern, description in patterns_to_check:
-                count = buffer.count(pattern)
-                if count > pattern_counts[pattern]:
-                    new_occurrences = count - pattern_counts[pattern]
-                    pattern_counts[pattern] = count
+                start = max(0, len(buffer) - len(chunk) - len(pattern) + 1)
+                new_occurrences = buffer.count(pattern, start)
+                if new_occurrences:
+                    pattern_counts[pattern] += new_occurrences
                     print(f"Found {new_occurrences} occurrence(s) of {description}")
             
             # Print periodic stats
@@ -60,23 +72,22 @@ def inspect_data():
                 print(f"  Chunks received: {chunk_count}")
                 
                 if byte_count > 0:
-                    # Show first 200 bytes as hex
-                    sample = buffer[:200]
-                    print(f"  First {min(len(sample), 200)} bytes (hex): {sample.hex()}")
+                    # Show first 200 bytes as hex (the view must be released before the buffer grows)
+                    with memoryview(buffer)[:200] as sample:
+                        print(f"  First {min(len(sample), 200)} bytes (hex): {sample.hex()}")
                     
-                    # Try to show as ASCII
-                    ascii_sample = sample.decode('ascii', errors='replace')[:100]
-                    print(f"  As ASCII (first 100 chars): {repr(ascii_sample)}")
+                        # Try to show as ASCII
+                        ascii_sample = str(sample[:100], 'ascii', errors='replace')
+                        print(f"  As ASCII (first 100 chars): {repr(ascii_sample)}")
                     
-                    # Show byte distribution
-                    printable_count = sum(1 for b in sample if 32 <= b <= 126)
-                    null_count = sample.count(0)
-                    print(f"  Printable ASCII bytes: {printable_count}/{len(sample)} ({100*printable_count/len(sample):.1f}%)")
-                    print(f"  Null bytes: {null_count}")
+                        # Show byte distribution
+                        printable_count, null_count = count_printable_and_null(sample)
+                        print(f"  Printable ASCII bytes: {printable_count}/{len(sample)} ({100*printable_count/len(sample):.1f}%)")
+                        print(f"  Null bytes: {null_count}")
                     
                     # Show most common bytes
                     print("  Most common bytes:")
-                    for byte, count in byte_histogram.most_common(5):
+                    for byte, count in most_common_bytes(byte_histogram, 5):
                         char_repr = chr(byte) if 32 <= byte <= 126 else f"\\x{byte:02x}"
                         print(f"    {byte:3d} ('{char_repr}'): {count} times")
                 
@@ -85,7 +96,7 @@ def inspect_data():
             # Keep buffer manageable
             if len(buffer) > 10000:
                 # Keep last 1000 bytes for pattern detection
-                buffer = buffer[-1000:]
+                del buffer[:-1000]
             
             time.sleep(0.1)  # Small delay to prevent overwhelming output
                 
@@ -103,12 +114,12 @@ def inspect_data():
         
         if byte_count > 0:
             print("\nData Analysis:")
-            printable_total = sum(count for byte, count in byte_histogram.items() if 32 <= byte <= 126)
+            printable_total = int(byte_histogram[32:127].sum())
             print(f"  Total printable ASCII: {printable_total}/{byte_count} ({100*printable_total/byte_count:.1f}%)")
-            print(f"  Total null bytes: {byte_histogram.get(0, 0)}")
+            print(f"  Total null bytes: {byte_histogram[0]}")
             
             print("\n  Top 10 most common bytes:")
-            for byte, count in byte_histogram.most_common(10):
+            for byte, count in most_common_bytes(byte_histogram, 10):
                 char_repr = chr(byte) if 32 <= byte <= 126 else f"\\x{byte:02x}"
                 percent = 100 * count / byte_count
                 print(f"    {byte:3d} ('{char_repr}'): {count:6d} times ({percent:5.1f}%)")
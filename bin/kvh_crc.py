@@ -0,0 +1,84 @@
+"""
+CRC-32/MPEG-2 of KVH binary frames, one at a time or in batches.
+"""
+
+import zlib
+
+import numpy as np
+
+
+# Every byte value with its bit order reversed
+_BITREV8 = bytes(int(f'{i:08b}'[::-1], 2) for i in range(256))
+
+
+def _bitrev32(value):
+    """Reverse the bit order of a 32-bit value"""
+    return int.from_bytes(value.to_bytes(4, 'little').translate(_BITREV8), 'big')
+
+
+def calculate_crc32(data):
+    """
+    Calculate CRC-32/MPEG-2 checksum as used in C++ implementation.
+    This implements the same algorithm as the C++ uiCalcCRC function.
+
+    zlib's CRC-32 uses the same polynomial bit-reflected (0xEDB88320) with a
+    final inversion, so running it over bit-reversed bytes and undoing both
+    gives the MPEG-2 CRC at C speed.
+    """
+    return _bitrev32(~zlib.crc32(bytes(data).translate(_BITREV8)) & 0xFFFFFFFF)
+
+
+def _make_crc32_mpeg2_table():
+    """Precompute the CRC-32/MPEG-2 remainder of every possible leading byte"""
+    table = []
+    for byte in range(256):
+        crc = byte << 24
+        for _ in range(8):
+            if crc & 0x80000000:
+                crc = (crc << 1) ^ 0x04C11DB7
+            else:
+                crc = crc << 1
+            crc = crc & 0xFFFFFFFF
+        table.append(crc)
+    return np.array(table, dtype=np.uint32)
+
+
+_CRC32_MPEG2_TABLE = _make_crc32_mpeg2_table()
+
+
+def crc32_mpeg2_batch(frames):
+    """
+    Calculate the CRC-32/MPEG-2 of every row of a 2D uint8 array.
+
+    All frames advance through the table lookup in lockstep, so the Python
+    loop runs once per byte column rather than once per byte of the capture.
+    """
+    crc = np.full(frames.shape[0], 0xFFFFFFFF, dtype=np.uint32)
+    for column in frames.T:
+        crc = (crc << 8) ^ _CRC32_MPEG2_TABLE[(crc >> 24) ^ column]
+    return crc
+
+
+def verify_capture(data, header=b'\xFE\x81\xFF\x56', frame_len=40, crc_offset=36, crc_start=0):
+    """
+    Check the CRC of every complete frame starting with header in a capture.
+
+    The CRC is computed over bytes crc_start..crc_offset of each frame and
+    compared with the big-endian uint32 stored at crc_offset. By default it
+    covers every byte before the CRC field, header included. Defaults match
+    binary format B. Returns (frames, valid_frames).
+    """
+    positions = []
+    pos = data.find(header)
+    while pos != -1 and pos + frame_len <= len(data):
+        positions.append(pos)
+        pos = data.find(header, pos + 1)
+
+    if not positions:
+        return 0, 0
+
+    raw = np.frombuffer(data, dtype=np.uint8)
+    frames = raw[np.array(positions)[:, None] + np.arange(frame_len)]
+    calculated = crc32_mpeg2_batch(frames[:, crc_start:crc_offset])
+    received = np.ascontiguousarray(frames[:, crc_offset:crc_offset + 4]).view('>u4').ravel()
+    return len(positions), int(np.count_nonzero(calculated == received))
@@ -0,0 +1,190 @@
+"""
+Shared helpers for talking to the KVH device from the bin/ debugging scripts.
+"""
+
+import os
+import re
+import select
+import subprocess
+import sys
+import threading
+import time
+from functools import lru_cache
+
+import serial
+
+
+# Minimum spacing between commands sent to the device (as in configure_kvh_device.py)
+COMMAND_GAP_S = 0.2
+
+# Every byte outside printable ASCII, for deleting with bytes.translate
+NON_PRINTABLE = bytes(b for b in range(256) if not 0x20 <= b < 0x7F)
+
+
+def capture_stream(args, duration, chunk_size=65536):
+    """
+    Run a capture command (e.g. socat) and collect its stdout for duration seconds.
+
+    A background thread drains the pipe while the caller waits, so a device
+    streaming at a high baud rate cannot fill the OS pipe buffer and stall
+    the capture process. Returns the captured data as a bytearray.
+    """
+    proc = subprocess.Popen(args, stdout=subprocess.PIPE)
+    fd = proc.stdout.fileno()
+    buffer = bytearray()
+    stop = threading.Event()
+
+    def drain(timeout):
+        """Read one chunk if available, returning False at end of stream"""
+        ready, _, _ = select.select([fd], [], [], timeout)
+        if not ready:
+            return True
+        chunk = os.read(fd, chunk_size)
+        buffer.extend(chunk)
+        return bool(chunk)
+
+    def reader():
+        while not stop.is_set() and drain(0.05):
+            pass
+
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    time.sleep(duration)
+    stop.set()
+    thread.join()
+
+    proc.terminate()
+    proc.wait()
+    # Keep whatever the process flushed before exiting
+    while select.select([fd], [], [], 0)[0] and drain(0):
+        pass
+    proc.stdout.close()
+    return buffer
+
+
+def set_latency_timer(device_path, milliseconds=1):
+    """
+    Lower the USB-serial adapter's latency timer (FTDI default 16 ms) on Linux.
+
+    The timer caps how quickly the adapter hands short replies to the host,
+    so it bounds every command exchange regardless of the code above it.
+    Writing the sysfs attribute needs root or a udev rule. There is no sysfs
+    on macOS; set the latency there in the FTDI driver's Info.plist or with
+    pyftdi instead. Returns True if the timer was set.
+    """
+    tty = os.path.basename(os.path.realpath(device_path))
+    latency_path = f'/sys/bus/usb-serial/devices/{tty}/latency_timer'
+    if not os.path.exists(latency_path):
+        return False
+    try:
+        with open(latency_path, 'w') as f:
+            f.write(str(milliseconds))
+        return True
+    except OSError as e:
+        print(f"Could not set latency timer of {tty} to {milliseconds} ms: {e}")
+        return False
+
+
+def open_kvh(device_path, baud_rate, timeout=0.05):
+    """
+    Open the KVH serial port once so it can be reused for every command.
+
+    On Linux the driver is also put in low-latency mode (ASYNC_LOW_LATENCY),
+    so USB-serial adapters hand over received bytes immediately instead of
+    batching them for up to 16 ms.
+    """
+    ser = serial.Serial(device_path, baud_rate, timeout=timeout)
+    if sys.platform.startswith('linux'):  # pyserial raises NotImplementedError elsewhere
+        try:
+            ser.set_low_latency_mode(True)
+        except ValueError as e:  # Not every driver supports TIOCSSERIAL
+            print(f"Could not enable low-latency mode: {e}")
+    return ser
+
+
+def read_for(ser, duration):
+    """Read everything the device sends during the next duration seconds"""
+    buffer = bytearray()
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        buffer.extend(ser.read(ser.in_waiting or 1))
+    return bytes(buffer)
+
+
+def read_into(ser, buffer, duration):
+    """
+    Fill a preallocated buffer with what the device sends in the next duration seconds.
+
+    Reads go straight into buffer through a memoryview, so a long capture
+    needs no growing or final copy. Stops early if the buffer is full and
+    returns the number of bytes read.
+    """
+    n = 0
+    deadline = time.monotonic() + duration
+    with memoryview(buffer) as view:
+        while n < len(buffer) and time.monotonic() < deadline:
+            n += ser.readinto(view[n:]) or 0
+    return n
+
+
+@lru_cache(maxsize=None)
+def _reply_line_regex(terminator):
+    """Regex for a printable ASCII line (two characters or more) ending in terminator"""
+    return re.compile(rb'[\x20-\x7e]{2,}' + re.escape(terminator))
+
+
+def await_response(ser, terminator=b'\r\n', max_bytes=256, deadline_s=0.25, min_s=COMMAND_GAP_S, idle_s=0.05):
+    """
+    Wait for a reply to a command, returning as soon as it is complete.
+
+    Polls the input buffer every millisecond until a printable ASCII line
+    ending in terminator has been received, then keeps reading until the
+    line has been idle for idle_s seconds so multi-line replies are read in
+    full. Gives up after deadline_s seconds, instead of always sleeping for
+    the worst-case response time. Streamed binary output does not count as a
+    reply; only the last max_bytes of it are kept. An early reply still waits
+    out min_s, so consecutive commands keep a minimum spacing.
+    """
+    reply_line = _reply_line_regex(terminator)
+    buffer = bytearray()
+    replied = False
+    start = last_data = time.monotonic()
+    while True:
+        now = time.monotonic()
+        if now - start >= deadline_s:
+            break
+        if replied and now - last_data >= idle_s and now - start >= min_s:
+            break
+        waiting = ser.in_waiting
+        if waiting:
+            buffer.extend(ser.read(waiting))
+            last_data = now
+            if not replied:
+                replied = reply_line.search(buffer) is not None
+                if not replied:
+                    del buffer[:-max_bytes]
+        else:
+            time.sleep(0.001)
+    return bytes(buffer)
+
+
+def read_burst(ser, min_bytes=128, idle_s=0.4, max_s=2, poll_s=0.005):
+    """
+    Sample the incoming stream only until there is enough to judge it.
+
+    Returns once min_bytes have arrived, the line has been idle for idle_s
+    seconds or max_s seconds have passed, whichever comes first.
+    """
+    buffer = bytearray()
+    start = last_data = time.monotonic()
+    while True:
+        now = time.monotonic()
+        if len(buffer) >= min_bytes or now - last_data >= idle_s or now - start >= max_s:
+            break
+        waiting = ser.in_waiting
+        if waiting:
+            buffer.extend(ser.read(waiting))
+            last_data = now
+        else:
+            time.sleep(poll_s)
+    return bytes(buffer)
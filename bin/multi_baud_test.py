@@ -5,36 +5,28 @@ Multi-baud Rate Device Detection Script
 Try different baud rates and communication settings to identify the connected device.
 """
 
-import subprocess
-import time
+from kvh_serial import NON_PRINTABLE, await_response, open_kvh, read_burst, set_latency_timer
 
-def test_baud_rate(baud_rate, device_path):
-    """Test communication at a specific baud rate"""
+def test_baud_rate(ser, baud_rate):
+    """Test communication at a specific baud rate on an already open port"""
     
     print(f"\n=== Testing {baud_rate} baud ===")
     
     # Try to get data at this baud rate
     try:
-        proc = subprocess.Popen(
-            ['socat', f'{device_path},raw,echo=0,ispeed={baud_rate},ospeed={baud_rate}', '-'], 
-            stdout=subprocess.PIPE, stderr=subprocess.PIPE
-        )
-        time.sleep(2)  # Collect for 2 seconds
-        proc.terminate()
-        stdout, stderr = proc.communicate(timeout=3)
+        ser.baudrate = baud_rate
+        ser.reset_input_buffer()
+        # Stop as soon as there is enough data to judge, or the line goes quiet
+        stdout = read_burst(ser, min_bytes=128, idle_s=0.4, max_s=2)
         
         if len(stdout) > 0:
             print(f"Received {len(stdout)} bytes at {baud_rate} baud")
             print(f"First 50 bytes (hex): {stdout[:50].hex()}")
             
             # Check for ASCII content
-            try:
-                ascii_data = stdout.decode('ascii', errors='ignore')
-                printable_chars = ''.join(c for c in ascii_data if c.isprintable())
-                if len(printable_chars) > 10:  # If we have decent ASCII content
-                    print(f"ASCII content: {printable_chars[:100]}")
-            except:
-                pass
+            printable_chars = stdout.translate(None, NON_PRINTABLE).decode('ascii')
+            if len(printable_chars) > 10:  # If we have decent ASCII content
+                print(f"ASCII content: {printable_chars[:100]}")
             
             # Look for patterns that might indicate structured data
             if len(stdout) >= 10:
@@ -54,38 +46,25 @@ def test_baud_rate(baud_rate, device_path):
         print(f"Error testing {baud_rate} baud: {e}")
         return False
 
-def test_command_response(command, baud_rate, device_path):
+def test_command_response(ser, command, baud_rate):
     """Test if device responds to a command at specific baud rate"""
     
     print(f"Testing command '{command}' at {baud_rate} baud...")
     
     try:
-        # Send command
-        cmd = f'echo "{command}" | socat - {device_path},raw,echo=0,ispeed={baud_rate},ospeed={baud_rate}'
-        result = subprocess.run(cmd, shell=True, capture_output=True, timeout=3)
-        
-        time.sleep(1)  # Wait for response
-        
-        # Read response
-        proc = subprocess.Popen(
-            ['socat', f'{device_path},raw,echo=0,ispeed={baud_rate},ospeed={baud_rate}', '-'], 
-            stdout=subprocess.PIPE
-        )
-        time.sleep(1)
-        proc.terminate()
-        stdout, _ = proc.communicate(timeout=2)
+        # Send the command and read the reply in the same session
+        ser.baudrate = baud_rate
+        ser.reset_input_buffer()
+        ser.write((command + '\r\n').encode())
+        stdout = await_response(ser, deadline_s=1)
         
         if len(stdout) > 0:
             print(f"  Response: {len(stdout)} bytes")
             # Check for meaningful ASCII response
-            try:
-                ascii_resp = stdout.decode('ascii', errors='ignore')
-                printable_resp = ''.join(c for c in ascii_resp if c.isprintable()).strip()
-                if len(printable_resp) > 3:
-                    print(f"  ASCII response: {printable_resp[:50]}")
-                    return True
-            except:
-                pass
+            printable_resp = stdout.translate(None, NON_PRINTABLE).decode('ascii').strip()
+            if len(printable_resp) > 3:
+                print(f"  ASCII response: {printable_resp[:50]}")
+                return True
         
         return False
         
@@ -100,6 +79,7 @@ def main():
     
     print("=== Multi-Baud Rate Device Detection ===")
     print(f"Testing device: {device_path}")
+    set_latency_timer(device_path)
     
     # Common baud rates for various devices
     baud_rates = [
@@ -116,36 +96,38 @@ def main():
     
     working_rates = []
     
-    for baud_rate in baud_rates:
-        if test_baud_rate(baud_rate, device_path):
-            working_rates.append(baud_rate)
-    
-    print(f"\n=== Summary ===")
-    if working_rates:
-        print(f"Baud rates with data: {working_rates}")
-    else:
-        print("No baud rates produced data")
-    
-    # Test some common device commands at working baud rates
-    if working_rates:
-        print(f"\n=== Testing Commands ===")
-        test_commands = [
-            "AT",           # Modem commands
-            "AT+ID=?",      # Some IoT devices
-            "?",            # Generic help
-            "VER",          # Version command
-            "ID",           # ID command
-            "*IDN?",        # SCPI identification
-            "INFO",         # Info command
-            "\r\n",         # Just newlines
-        ]
+    # Reuse one connection for the sweep and the command tests, only switching its baud rate
+    with open_kvh(device_path, baud_rates[0]) as ser:
+        for baud_rate in baud_rates:
+            if test_baud_rate(ser, baud_rate):
+                working_rates.append(baud_rate)
         
-        for baud_rate in working_rates[:2]:  # Test top 2 working rates
-            print(f"\nTesting commands at {baud_rate} baud:")
-            for cmd in test_commands:
-                if test_command_response(cmd, baud_rate, device_path):
-                    print(f"  ✓ '{cmd}' got response at {baud_rate} baud!")
-                    break
+        print(f"\n=== Summary ===")
+        if working_rates:
+            print(f"Baud rates with data: {working_rates}")
+        else:
+            print("No baud rates produced data")
+        
+        # Test some common device commands at working baud rates
+        if working_rates:
+            print(f"\n=== Testing Commands ===")
+            test_commands = [
+                "AT",           # Modem commands
+                "AT+ID=?",      # Some IoT devices
+                "?",            # Generic help
+                "VER",          # Version command
+                "ID",           # ID command
+                "*IDN?",        # SCPI identification
+                "INFO",         # Info command
+                "\r\n",         # Just newlines
+            ]
+            
+            for baud_rate in working_rates[:2]:  # Test top 2 working rates
+                print(f"\nTesting commands at {baud_rate} baud:")
+                for cmd in test_commands:
+                    if test_command_response(ser, cmd, baud_rate):
+                        print(f"  ✓ '{cmd}' got response at {baud_rate} baud!")
+                        break
 
 if __name__ == "__main__":
     main()
@@ -3,29 +3,28 @@
 Simple KVH device reset and configuration script
 """
 
-import subprocess
+import re
 import time
 
-def send_single_command(cmd):
-    """Send a single command to the KVH device"""
-    device_path = "/dev/cu.usbserial-FT0R4P590"
+import serial
+
+from kvh_crc import verify_capture
+from kvh_serial import await_response, open_kvh, read_into, set_latency_timer
+
+# Start of a possible KVH header in either byte order (overlapping matches)
+PARTIAL_HEADER_RE = re.compile(rb'(?=\xfe\x81|\x81\xfe)')
+
+def send_single_command(ser, cmd):
+    """Send a single command to the KVH device over an open serial port"""
     
     print(f"Sending: {cmd}")
     
-    # Use printf to send command with proper line endings
-    full_cmd = f'printf "{cmd}\\r\\n" | socat - {device_path},raw,echo=0,ispeed=115200,ospeed=115200,bs1,cs8,cstopb=1'
-    
     try:
-        result = subprocess.run(full_cmd, shell=True, capture_output=True, text=True, timeout=2)
-        if result.returncode == 0:
-            print(f"  ✓ Command sent successfully")
-        else:
-            print(f"  ✗ Command failed: {result.stderr}")
-        return result.returncode == 0
-    except subprocess.TimeoutExpired:
-        print(f"  ✓ Command sent (timeout expected)")
+        ser.write((cmd + '\r\n').encode())
+        ser.flush()
+        print(f"  ✓ Command sent successfully")
         return True
-    except Exception as e:
+    except serial.SerialException as e:
         print(f"  ✗ Error: {e}")
         return False
 
@@ -33,41 +32,46 @@ def main():
     """Main configuration sequence"""
     
     print("=== KVH P1775 Reset and Configuration ===")
+    device_path = "/dev/cu.usbserial-FT0R4P590"
+    set_latency_timer(device_path)
     
-    # Try to stop any current data output first
-    print("\n1. Attempting to stop current data output...")
-    send_single_command("=CONFIG,1")  # Enter config mode
-    time.sleep(1)
-    
-    print("\n2. Sending reset command...")
-    send_single_command("=RESET")
-    time.sleep(2)  # Wait for reset
-    
-    print("\n3. Configuring device...")
-    commands = [
-        "=CONFIG,1",         # Enter configuration mode
-        "=OUTPUTFMT,B",      # Set output format to binary format B
-        "=OUTPUTRATE,10",    # Set lower output rate first (10Hz)  
-        "=OUTPUTBAUD,115200", # Set baud rate to 115200
-        "=CONFIG,0"          # Exit configuration mode
-    ]
-    
-    for cmd in commands:
-        send_single_command(cmd)
-        time.sleep(1)  # Wait between commands
-    
-    print("\n4. Waiting for device to stabilize...")
-    time.sleep(3)
-    
-    print("\n5. Testing output...")
-    proc = subprocess.Popen(['socat', '/dev/cu.usbserial-FT0R4P590,raw,echo=0,ispeed=115200,ospeed=115200', '-'], 
-                           stdout=subprocess.PIPE)
-    time.sleep(5)  # Collect data for 5 seconds
-    proc.terminate()
-    stdout, _ = proc.communicate()
+    # Keep one connection open for the whole command sequence and the output test
+    with open_kvh(device_path, 115200) as ser:
+        # Try to stop any current data output first
+        print("\n1. Attempting to stop current data output...")
+        send_single_command(ser, "=CONFIG,1")  # Enter config mode
+        await_response(ser, deadline_s=1)
+        
+        print("\n2. Sending reset command...")
+        send_single_command(ser, "=RESET")
+        time.sleep(2)  # Wait for reset
+        
+        print("\n3. Configuring device...")
+        commands = [
+            "=CONFIG,1",         # Enter configuration mode
+            "=OUTPUTFMT,B",      # Set output format to binary format B
+            "=OUTPUTRATE,10",    # Set lower output rate first (10Hz)  
+            "=OUTPUTBAUD,115200", # Set baud rate to 115200
+            "=CONFIG,0"          # Exit configuration mode
+        ]
+        
+        for cmd in commands:
+            send_single_command(ser, cmd)
+            await_response(ser, deadline_s=1)  # Wait for the device to acknowledge
+        
+        print("\n4. Waiting for device to stabilize...")
+        time.sleep(3)
+        
+        print("\n5. Testing output...")
+        ser.reset_input_buffer()  # Only look at output produced after stabilizing
+        stdout = bytearray(65536)
+        n = read_into(ser, stdout, 5)  # Collect data for 5 seconds
+        del stdout[n:]  # Trim the unused tail in place, without copying the capture
     
     print(f"Received {len(stdout)} bytes")
-    print(f"First 100 bytes (hex): {stdout[:100].hex()}")
+    # Hex of the head of the capture, shared by the dump and the pattern report below
+    hex_view = stdout[:104].hex()
+    print(f"First 100 bytes (hex): {hex_view[:200]}")
     
     # Look for KVH headers
     headers = [
@@ -76,12 +80,16 @@ def main():
         (b'\xFE\x81\xFF\x57', "Format C"),
     ]
     
-    found = False
-    for header_bytes, header_name in headers:
-        if header_bytes in stdout:
-            print(f"✓ Found {header_name} header!")
-            found = True
-            break
+    # First position of each header, found by C-level searches
+    header_positions = {header_name: stdout.find(header_bytes) for header_bytes, header_name in headers}
+    found = next((header_name for header_name, pos in header_positions.items() if pos != -1), None)
+    if found:
+        print(f"✓ Found {found} header!")
+    
+    # Check the integrity of the Format B frames the device was configured for
+    frames, valid_frames = verify_capture(stdout)
+    if frames:
+        print(f"CRC valid for {valid_frames}/{frames} complete Format B frames")
     
     if not found:
         print("✗ No KVH headers found. Device may not be in binary format.")
@@ -89,10 +97,10 @@ def main():
         
         # Check for repeating patterns that might indicate message boundaries
         if len(stdout) >= 40:
-            for i in range(min(len(stdout) - 40, 100)):
-                chunk = stdout[i:i+4]
-                if chunk == b'\xFE\x81' or chunk == b'\x81\xFE':
-                    print(f"Potential header pattern at position {i}: {chunk.hex()}")
+            # One regex pass over the first 100 offsets instead of a Python loop
+            for match in PARTIAL_HEADER_RE.finditer(stdout, 0, min(len(stdout) - 40, 100) + 1):
+                i = match.start()
+                print(f"Potential header pattern at position {i}: {hex_view[2*i:2*i+8]}")
 
 if __name__ == "__main__":
     main()
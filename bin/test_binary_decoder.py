@@ -4,6 +4,45 @@ import struct
 import sys
 import os
 import logging
+from collections import namedtuple
+
+import numpy as np
+
+# Format B layout: header + 6 floats + timestamp + status + sequence + temp + crc
+_FMT_B = struct.Struct('>IffffffIBBhI')
+assert _FMT_B.size == 40
+
+# One decoded format B message, fields in wire order
+KvhFrame = namedtuple('KvhFrame', 'header gyro_x gyro_y gyro_z accel_x accel_y accel_z '
+                                  'timestamp_us status sequence temperature_raw crc')
+
+# Same layout as a numpy structured dtype, for decoding many frames at once
+KVH_FORMAT_B_DTYPE = np.dtype([
+    ('header', '>u4'),
+    ('gyro', '>f4', 3),
+    ('accel', '>f4', 3),
+    ('timestamp_us', '>u4'),
+    ('status', 'u1'),
+    ('sequence', 'u1'),
+    ('temperature_raw', '>i2'),
+    ('crc', '>u4'),
+])
+assert KVH_FORMAT_B_DTYPE.itemsize == _FMT_B.size
+
+# Status bit of each sensor (0 = valid, 1 = invalid per OpenDLV code)
+SENSOR_STATUS_BITS = {
+    'gyro_x': 0x01,
+    'gyro_y': 0x02,
+    'gyro_z': 0x04,
+    'accel_x': 0x10,
+    'accel_y': 0x20,
+    'accel_z': 0x40,
+}
+_STATUS_BITS = np.array(list(SENSOR_STATUS_BITS.values()), dtype=np.uint8)
+
+def sensor_valid(frame, sensor):
+    """Check one sensor's validity bit in a frame's status, e.g. sensor_valid(frame, 'gyro_x')"""
+    return not frame.status & SENSOR_STATUS_BITS[sensor]
 
 def decode_kvh_binary_format_b(data):
     """
@@ -22,68 +61,58 @@ def decode_kvh_binary_format_b(data):
     - Sequence: 1 byte (0-127, wrapping counter)
     - Temperature: 2 bytes (int16, degrees C)
     - CRC: 4 bytes (uint32)
+    
+    Returns a KvhFrame; sensor validity is read from its status with
+    sensor_valid().
     """
-    if len(data) != 40:
-        print(f"ERROR: Expected 40 bytes, got {len(data)}")
+    if len(data) != _FMT_B.size:
+        print(f"ERROR: Expected {_FMT_B.size} bytes, got {len(data)}")
+        return None
+    
+    # Validate header before paying for the float unpacking
+    if data[:4] != b'\xFE\x81\xFF\x56':
+        print(f"ERROR: Invalid header 0x{bytes(data[:4]).hex().upper()}, expected 0xFE81FF56")
         return None
     
     try:
         # Unpack the entire binary data using big-endian format 
         # Device sends data in big-endian (network byte order)
         # Format: I f f f f f f I B B h I (12 items total)
-        unpacked = struct.unpack('>IffffffIBBhI', data)
-        
-        header = unpacked[0]
-        gyro_x = unpacked[1]
-        gyro_y = unpacked[2] 
-        gyro_z = unpacked[3]
-        accel_x = unpacked[4]
-        accel_y = unpacked[5]
-        accel_z = unpacked[6]
-        timestamp_us = unpacked[7]
-        status = unpacked[8]
-        sequence = unpacked[9]
-        temperature_raw = unpacked[10]
-        crc = unpacked[11]
-        
-        # Validate header
-        if header != 0xFE81FF56:
-            print(f"ERROR: Invalid header 0x{header:08X}, expected 0xFE81FF56")
-            return None
-            
-        # Decode status bits (0 = valid, 1 = invalid per OpenDLV code)
-        gyro_x_valid = (status & 0x01) == 0
-        gyro_y_valid = (status & 0x02) == 0
-        gyro_z_valid = (status & 0x04) == 0
-        accel_x_valid = (status & 0x10) == 0
-        accel_y_valid = (status & 0x20) == 0
-        accel_z_valid = (status & 0x40) == 0
-        
-        return {
-            'header': header,
-            'gyro_x': gyro_x,
-            'gyro_y': gyro_y,
-            'gyro_z': gyro_z,
-            'accel_x': accel_x,
-            'accel_y': accel_y,
-            'accel_z': accel_z,
-            'timestamp_us': timestamp_us,
-            'status': status,
-            'sequence': sequence,
-            'temperature_raw': temperature_raw,
-            'gyro_x_valid': gyro_x_valid,
-            'gyro_y_valid': gyro_y_valid,
-            'gyro_z_valid': gyro_z_valid,
-            'accel_x_valid': accel_x_valid,
-            'accel_y_valid': accel_y_valid,
-            'accel_z_valid': accel_z_valid,
-            'crc': crc
-        }
+        return KvhFrame._make(_FMT_B.unpack(data))
         
     except struct.error as e:
         print(f"ERROR: Failed to unpack binary data: {e}")
         return None
 
+def decode_many(buf):
+    """
+    Decode a buffer of back-to-back KVH binary format B messages in one call.
+    
+    Returns a structured array with one KVH_FORMAT_B_DTYPE record per frame,
+    so gyro/accel/timestamp columns are available without a per-frame loop.
+    Frames with an invalid header are reported and dropped.
+    """
+    if len(buf) % KVH_FORMAT_B_DTYPE.itemsize != 0:
+        print(f"ERROR: Buffer of {len(buf)} bytes is not a whole number of {KVH_FORMAT_B_DTYPE.itemsize}-byte frames")
+        return None
+    
+    frames = np.frombuffer(buf, dtype=KVH_FORMAT_B_DTYPE)
+    
+    # Validate all headers in one comparison
+    bad = np.flatnonzero(frames['header'] != 0xFE81FF56)
+    if bad.size:
+        print(f"ERROR: Invalid header in {bad.size} frames (first: {bad[:5].tolist()}), expected 0xFE81FF56")
+        frames = np.delete(frames, bad)
+    
+    return frames
+
+def sensor_validity(frames):
+    """
+    Decode the status byte of every frame into an (N, 6) boolean array of
+    gyro X/Y/Z and accel X/Y/Z validity
+    """
+    return (frames['status'][:, None] & _STATUS_BITS) == 0
+
 def create_test_message():
     """
     Create a test KVH binary format B message for testing
@@ -105,12 +134,11 @@ def create_test_message():
     # Pack into binary format using BIG-ENDIAN (device format)
     # Format: I f f f f f f I B B h I (12 items total)
     #         header + 6 floats + timestamp + status + sequence + temp + crc
-    full_message = struct.pack('>IffffffIBBhI', 
-                              header,
-                              gyro_x, gyro_y, gyro_z,
-                              accel_x, accel_y, accel_z,
-                              timestamp_us, status, sequence, temperature,
-                              crc)
+    full_message = _FMT_B.pack(header,
+                               gyro_x, gyro_y, gyro_z,
+                               accel_x, accel_y, accel_z,
+                               timestamp_us, status, sequence, temperature,
+                               crc)
     
     return full_message
 
@@ -134,25 +162,25 @@ def test_decoder():
         return False
     
     print("\nDecoded values:")
-    print(f"  Gyro X: {result['gyro_x']:.3f} rad/s")
-    print(f"  Gyro Y: {result['gyro_y']:.3f} rad/s") 
-    print(f"  Gyro Z: {result['gyro_z']:.3f} rad/s")
-    print(f"  Accel X: {result['accel_x']:.3f} m/s²")
-    print(f"  Accel Y: {result['accel_y']:.3f} m/s²")
-    print(f"  Accel Z: {result['accel_z']:.3f} m/s²")
-    print(f"  Timestamp: {result['timestamp_us']} μs")
-    print(f"  Status: 0x{result['status']:02x}")
-    print(f"  Sequence: {result['sequence']}")
-    print(f"  Temperature: {result['temperature_raw']}")
-    print(f"  CRC: 0x{result['crc']:08x}")
+    print(f"  Gyro X: {result.gyro_x:.3f} rad/s")
+    print(f"  Gyro Y: {result.gyro_y:.3f} rad/s") 
+    print(f"  Gyro Z: {result.gyro_z:.3f} rad/s")
+    print(f"  Accel X: {result.accel_x:.3f} m/s²")
+    print(f"  Accel Y: {result.accel_y:.3f} m/s²")
+    print(f"  Accel Z: {result.accel_z:.3f} m/s²")
+    print(f"  Timestamp: {result.timestamp_us} μs")
+    print(f"  Status: 0x{result.status:02x}")
+    print(f"  Sequence: {result.sequence}")
+    print(f"  Temperature: {result.temperature_raw}")
+    print(f"  CRC: 0x{result.crc:08x}")
     
     print(f"\nSensor validity:")
-    print(f"  Gyro X valid: {result['gyro_x_valid']}")
-    print(f"  Gyro Y valid: {result['gyro_y_valid']}")
-    print(f"  Gyro Z valid: {result['gyro_z_valid']}")
-    print(f"  Accel X valid: {result['accel_x_valid']}")
-    print(f"  Accel Y valid: {result['accel_y_valid']}")
-    print(f"  Accel Z valid: {result['accel_z_valid']}")
+    print(f"  Gyro X valid: {sensor_valid(result, 'gyro_x')}")
+    print(f"  Gyro Y valid: {sensor_valid(result, 'gyro_y')}")
+    print(f"  Gyro Z valid: {sensor_valid(result, 'gyro_z')}")
+    print(f"  Accel X valid: {sensor_valid(result, 'accel_x')}")
+    print(f"  Accel Y valid: {sensor_valid(result, 'accel_y')}")
+    print(f"  Accel Z valid: {sensor_valid(result, 'accel_z')}")
     
     # Verify expected values
     expected_values = {
@@ -172,7 +200,7 @@ def test_decoder():
     tolerance = 1e-6
     
     for key, expected in expected_values.items():
-        actual = result[key]
+        actual = getattr(result, key)
         if abs(actual - expected) > tolerance:
             print(f"ERROR: {key} mismatch. Expected: {expected}, Got: {actual}")
             success = False
@@ -204,7 +232,31 @@ def test_invalid_messages():
     
     print("✓ Invalid message tests passed!")
 
+def test_decode_many():
+    """
+    Test the bulk decoder against the per-frame decoder
+    """
+    print("\nTesting bulk decoding...")
+    
+    buf = create_test_message() * 3
+    frames = decode_many(buf)
+    assert frames is not None and len(frames) == 3, "Should decode three frames"
+    
+    single = decode_kvh_binary_format_b(buf[:40])
+    assert np.allclose(frames['gyro'][0], [single.gyro_x, single.gyro_y, single.gyro_z])
+    assert np.allclose(frames['accel'][0], [single.accel_x, single.accel_y, single.accel_z])
+    assert frames['timestamp_us'][0] == single.timestamp_us
+    assert frames['temperature_raw'][0] == single.temperature_raw
+    assert sensor_validity(frames).all(), "All sensors should be valid"
+    print("✓ Bulk decoding matches per-frame decoding")
+    
+    assert decode_many(buf[:-1]) is None, "Should reject partial frame"
+    mixed = decode_many(buf + b'\xFF' * 40 + buf[:40])
+    assert len(mixed) == 4, "Should drop only the frame with the wrong header"
+    print("✓ Bulk decoding tests passed!")
+
 if __name__ == "__main__":
     test_decoder()
     test_invalid_messages()
+    test_decode_many()
     print("\nBinary decoder testing complete!")
@@ -5,57 +5,46 @@ KVH Device Communication Test
 Test if the KVH device responds to various commands and check its status.
 """
 
-import subprocess
 import time
-import threading
-from queue import Queue, Empty
 
-def send_command_and_get_response(command, timeout=3):
-    """Send a command and try to get a response"""
-    
-    device_path = "/dev/cu.usbserial-FT0R4P590"
+import serial
+
+from kvh_serial import COMMAND_GAP_S, NON_PRINTABLE, await_response, open_kvh, read_for, set_latency_timer
+
+_NON_PRINTABLE_EXCEPT_NEWLINES = NON_PRINTABLE.translate(None, b'\n\r')
+
+def send_command_and_get_response(ser, command, timeout=3):
+    """Send a command over an open serial port and try to get a response"""
     
     print(f"\nSending command: {command}")
     
     try:
-        # Use expect-like approach with socat
-        proc = subprocess.Popen(
-            ['socat', '-', f'{device_path},raw,echo=0,ispeed=115200,ospeed=115200'],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
+        # Drop stale input so only the reply to this command is read back
+        ser.reset_input_buffer()
         
         # Send command
-        if proc.stdin:
-            proc.stdin.write((command + '\r\n').encode())
-            proc.stdin.flush()
-        
-        # Wait a bit for response
-        time.sleep(timeout)
+        ser.write((command + '\r\n').encode())
+        ser.flush()
         
-        # Try to get response
-        proc.terminate()
-        stdout, stderr = proc.communicate(timeout=2)
+        # Return as soon as the reply is complete, or give up after the timeout,
+        # but always leave the device a minimum gap before the next command
+        stdout = await_response(ser, deadline_s=max(timeout, COMMAND_GAP_S))
         
         print(f"Response ({len(stdout)} bytes):")
         if len(stdout) > 0:
-            print(f"  Hex: {stdout[:100].hex()}")
-            print(f"  ASCII: {repr(stdout[:100])}")
-            # Try to decode as ASCII
-            try:
-                ascii_resp = stdout.decode('ascii', errors='replace')
-                printable_chars = ''.join(c for c in ascii_resp if c.isprintable())
-                if printable_chars.strip():
-                    print(f"  Printable: {printable_chars[:100]}")
-            except:
-                pass
+            head = stdout[:100]
+            print(f"  Hex: {head.hex()}")
+            print(f"  ASCII: {repr(head)}")
+            # Keep only the printable ASCII
+            printable_chars = stdout.translate(None, NON_PRINTABLE).decode('ascii')
+            if printable_chars.strip():
+                print(f"  Printable: {printable_chars[:100]}")
         else:
             print("  No response")
             
         return stdout
         
-    except Exception as e:
+    except serial.SerialException as e:
         print(f"Error: {e}")
         return b''
 
@@ -63,87 +52,80 @@ def main():
     """Test various KVH commands"""
     
     print("=== KVH Device Communication Test ===")
-    
-    # Try various commands that KVH devices might respond to
-    commands = [
-        "=CONFIG,1",      # Enter config mode
-        "=STATUS",        # Get status
-        "=VERSION",       # Get version
-        "=HELP",          # Get help
-        "=INFO",          # Get info
-        "=ID",            # Get ID
-        "=OUTPUTFMT",     # Get current output format
-        "=OUTPUTRATE",    # Get current output rate
-        "=OUTPUTBAUD",    # Get current baud rate
-        "?",              # Generic help
-        "*IDN?",          # SCPI identification
-        "=RESET",         # Reset device
-    ]
-    
-    responses = {}
-    
-    for cmd in commands:
-        response = send_command_and_get_response(cmd, timeout=2)
-        responses[cmd] = response
-        time.sleep(0.5)  # Brief pause between commands
-    
-    # Analyze responses
-    print(f"\n=== Response Analysis ===")
-    
-    meaningful_responses = []
-    for cmd, resp in responses.items():
-        if len(resp) > 0:
-            # Check if response contains ASCII text
-            try:
-                ascii_resp = resp.decode('ascii', errors='ignore')
-                printable_chars = ''.join(c for c in ascii_resp if c.isprintable())
+    device_path = "/dev/cu.usbserial-FT0R4P590"
+    set_latency_timer(device_path)
+    
+    # Keep one connection open for every command and the final capture
+    with open_kvh(device_path, 115200) as ser:
+        # Try various commands that KVH devices might respond to
+        commands = [
+            "=CONFIG,1",      # Enter config mode
+            "=STATUS",        # Get status
+            "=VERSION",       # Get version
+            "=HELP",          # Get help
+            "=INFO",          # Get info
+            "=ID",            # Get ID
+            "=OUTPUTFMT",     # Get current output format
+            "=OUTPUTRATE",    # Get current output rate
+            "=OUTPUTBAUD",    # Get current baud rate
+            "?",              # Generic help
+            "*IDN?",          # SCPI identification
+            "=RESET",         # Reset device
+        ]
+    
+        responses = {}
+    
+        # Replies arrive within milliseconds, so a silent command only costs
+        # a short deadline instead of seconds
+        for cmd in commands:
+            response = send_command_and_get_response(ser, cmd, timeout=0.3)
+            responses[cmd] = response
+            if cmd == "=RESET":
+                time.sleep(2)  # Let the device finish resetting before it gets more commands
+    
+        # Analyze responses
+        print(f"\n=== Response Analysis ===")
+    
+        meaningful_responses = []
+        for cmd, resp in responses.items():
+            if len(resp) > 0:
+                # Check if response contains ASCII text
+                printable_chars = resp.translate(None, NON_PRINTABLE).decode('ascii')
                 if printable_chars.strip() and len(printable_chars) > 3:
                     meaningful_responses.append((cmd, printable_chars.strip()))
-            except:
-                pass
     
-    if meaningful_responses:
-        print("Commands that got meaningful responses:")
-        for cmd, resp in meaningful_responses:
-            print(f"  {cmd}: {resp[:100]}")
-    else:
-        print("No meaningful ASCII responses detected")
+        if meaningful_responses:
+            print("Commands that got meaningful responses:")
+            for cmd, resp in meaningful_responses:
+                print(f"  {cmd}: {resp[:100]}")
+        else:
+            print("No meaningful ASCII responses detected")
     
-    # Try to put device in a known state
-    print(f"\n=== Attempting to Configure Device ===")
+        # Try to put device in a known state
+        print(f"\n=== Attempting to Configure Device ===")
     
-    config_commands = [
-        "=CONFIG,1",       # Enter config
-        "=OUTPUTFMT,A",    # Try ASCII format first
-        "=OUTPUTRATE,1",   # Very slow rate for testing
-        "=CONFIG,0",       # Exit config
-    ]
+        config_commands = [
+            "=CONFIG,1",       # Enter config
+            "=OUTPUTFMT,A",    # Try ASCII format first
+            "=OUTPUTRATE,1",   # Very slow rate for testing
+            "=CONFIG,0",       # Exit config
+        ]
     
-    for cmd in config_commands:
-        send_command_and_get_response(cmd, timeout=1)
-        time.sleep(1)
+        for cmd in config_commands:
+            send_command_and_get_response(ser, cmd, timeout=1)
     
-    print(f"\nWaiting for device output after configuration...")
-    time.sleep(2)
+        print(f"\nWaiting for device output after configuration...")
+        time.sleep(2)
     
-    # Check output after configuration
-    device_path = "/dev/cu.usbserial-FT0R4P590"
-    proc = subprocess.Popen(['socat', f'{device_path},raw,echo=0,ispeed=115200,ospeed=115200', '-'], 
-                           stdout=subprocess.PIPE)
-    time.sleep(5)
-    proc.terminate()
-    stdout, _ = proc.communicate()
+        # Check output after configuration
+        stdout = read_for(ser, 5)
     
-    print(f"Device output after configuration ({len(stdout)} bytes):")
-    if len(stdout) > 0:
-        print(f"First 200 bytes (hex): {stdout[:200].hex()}")
-        try:
-            ascii_output = stdout.decode('ascii', errors='replace')
-            printable_output = ''.join(c for c in ascii_output if c.isprintable() or c in '\n\r')
+        print(f"Device output after configuration ({len(stdout)} bytes):")
+        if len(stdout) > 0:
+            print(f"First 200 bytes (hex): {stdout[:200].hex()}")
+            printable_output = stdout.translate(None, _NON_PRINTABLE_EXCEPT_NEWLINES).decode('ascii')
             if printable_output.strip():
                 print(f"ASCII output: {printable_output[:200]}")
-        except:
-            pass
 
 if __name__ == "__main__":
     main()
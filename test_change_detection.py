@@ -4,42 +4,39 @@
 Test change detection functionality
 """
 
-# Mock the global variables that would normally be set in main
-last_gyro_data = None
-last_accel_data = None
-last_temp = None
+from functools import lru_cache
+
+import numpy as np
+
+# Fields compared between readings, in the order of the state arrays below
+_FIELDS = ('gyro_x', 'gyro_y', 'gyro_z', 'accel_x_ms2', 'accel_y_ms2', 'accel_z_ms2', 'temperature_raw')
+
+# Mock the global state that would normally be set in main
+last_state = None
+_current = np.empty(len(_FIELDS))  # Reused for every reading to avoid allocating per packet
+
+@lru_cache(maxsize=None)
+def _thresholds(threshold_gyro, threshold_accel, threshold_temp):
+    """Per-field thresholds matching _FIELDS"""
+    return np.array([threshold_gyro] * 3 + [threshold_accel] * 3 + [threshold_temp])
 
 def has_significant_change(decoded_data, threshold_gyro=0.01, threshold_accel=0.1, threshold_temp=1.0):
     """
     Check if there's a significant change in IMU data compared to the last reading.
     """
-    global last_gyro_data, last_accel_data, last_temp
+    global last_state
+    
+    for i, field in enumerate(_FIELDS):
+        _current[i] = decoded_data[field]
     
     # Always consider first packet as a change
-    if last_gyro_data is None or last_accel_data is None or last_temp is None:
-        last_gyro_data = (decoded_data['gyro_x'], decoded_data['gyro_y'], decoded_data['gyro_z'])
-        last_accel_data = (decoded_data['accel_x_ms2'], decoded_data['accel_y_ms2'], decoded_data['accel_z_ms2'])
-        last_temp = decoded_data['temperature_raw']
+    if last_state is None:
+        last_state = _current.copy()
         return True
     
-    # Check gyro changes
-    gyro_change = any(abs(current - last) > threshold_gyro 
-                     for current, last in zip([decoded_data['gyro_x'], decoded_data['gyro_y'], decoded_data['gyro_z']], 
-                                             last_gyro_data))
-    
-    # Check acceleration changes
-    accel_change = any(abs(current - last) > threshold_accel 
-                      for current, last in zip([decoded_data['accel_x_ms2'], decoded_data['accel_y_ms2'], decoded_data['accel_z_ms2']], 
-                                              last_accel_data))
-    
-    # Check temperature change
-    temp_change = abs(decoded_data['temperature_raw'] - last_temp) > threshold_temp
-    
-    # Update stored values if there's a change
-    if gyro_change or accel_change or temp_change:
-        last_gyro_data = (decoded_data['gyro_x'], decoded_data['gyro_y'], decoded_data['gyro_z'])
-        last_accel_data = (decoded_data['accel_x_ms2'], decoded_data['accel_y_ms2'], decoded_data['accel_z_ms2'])
-        last_temp = decoded_data['temperature_raw']
+    # Compare every field against its threshold in one vectorized check
+    if (np.abs(_current - last_state) > _thresholds(threshold_gyro, threshold_accel, threshold_temp)).any():
+        last_state[:] = _current  # Update stored values if there's a change
         return True
     
     return False
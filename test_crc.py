@@ -4,12 +4,19 @@
 Test CRC-32/MPEG-2 implementation against known values
 """
 
+import os
 import struct
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bin'))
+
+import kvh_crc
 
 def calculate_crc32(data):
     """
-    Calculate CRC-32/MPEG-2 checksum as used in C++ implementation.
-    This implements the same algorithm as the C++ uiCalcCRC function.
+    Reference CRC-32/MPEG-2, computed bit by bit as in the C++ uiCalcCRC function.
     """
     # CRC-32/MPEG-2 polynomial: 0x04C11DB7
     crc = 0xFFFFFFFF
@@ -25,6 +32,12 @@ def calculate_crc32(data):
     
     return crc
 
+def make_format_b_frame(sequence):
+    """Build a Format B frame whose CRC covers every byte before the CRC field"""
+    body = b'\xFE\x81\xFF\x56' + struct.pack('>ffffffIBBh', 0.1, 0.2, 0.3, 1.5, -2.1, 9.81,
+                                                   1234567890, 0, sequence, 250)
+    return body + struct.pack('>I', calculate_crc32(body))
+
 def test_crc():
     # Test with a simple known pattern
     test_data = b'\xFE\x81\xFF\x56'  # KVH header
@@ -39,6 +52,35 @@ def test_crc():
     test_pattern = b'\x00\x01\x02\x03\x04\x05\x06\x07\x08\x09\x0A\x0B'
     crc_pattern = calculate_crc32(test_pattern)
     print(f"CRC of test pattern: 0x{crc_pattern:08X}")
+    
+    # Standard CRC-32/MPEG-2 check value
+    crc_check = calculate_crc32(b'123456789')
+    print(f"CRC of '123456789': 0x{crc_check:08X} (should be 0x0376E6E7)")
+    assert crc_check == 0x0376E6E7, "Reference CRC does not match the CRC-32/MPEG-2 check value"
+    
+    # The zlib-based CRC used by bin/main must agree with the reference
+    assert kvh_crc.calculate_crc32(b'123456789') == 0x0376E6E7, "kvh_crc does not match the check value"
+    samples = [test_data, b'', test_pattern, b'123456789', bytes(range(256)) * 3]
+    for sample in samples:
+        assert kvh_crc.calculate_crc32(sample) == calculate_crc32(sample), f"kvh_crc mismatch for {sample[:16].hex()}"
+    print("✓ kvh_crc.calculate_crc32 matches the reference")
+
+def test_batch_crc():
+    """Check batch CRCs and capture verification against the reference"""
+    good = make_format_b_frame(42)
+    corrupted = bytearray(make_format_b_frame(43))
+    corrupted[10] ^= 0xFF  # Flip a payload byte, leaving the stored CRC stale
+    corrupted = bytes(corrupted)
+    
+    frames = np.frombuffer(good + corrupted, dtype=np.uint8).reshape(2, 40)
+    batch = kvh_crc.crc32_mpeg2_batch(frames[:, :36]).tolist()
+    assert batch == [calculate_crc32(good[:36]), calculate_crc32(corrupted[:36])], "Batch CRC mismatch"
+    print("✓ crc32_mpeg2_batch matches the reference")
+    
+    # Junk before the frames checks that they are found at any offset
+    assert kvh_crc.verify_capture(b'\x00\x01\x02' + good + corrupted) == (2, 1), "Expected 1 of 2 frames valid"
+    print("✓ verify_capture accepts the good frame and rejects the corrupted one")
 
 if __name__ == "__main__":
     test_crc()
+    test_batch_crc()